@@ -1,65 +1,121 @@
-import json
-from typing import Any, Dict
-
-import jsonschema
+import functools
+import itertools
+import os
+import warnings
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+import fastjsonschema
+import orjson
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+    warnings.warn("PyYAML was built without libyaml; using the pure-Python SafeLoader")
+
 
 def load_yaml(file_path: str) -> Dict[str, Any]:
-    with open(file_path, "r") as file:
-        return yaml.safe_load(file)
+    # Bytes go straight to libyaml, which does its own UTF-8 decoding
+    with open(file_path, "rb") as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def iter_yaml_documents(file_path: str) -> Iterator[Dict[str, Any]]:
+    # Config bundles may hold several YAML documents; they are parsed lazily,
+    # one at a time, with large reads to keep syscalls down. Empty documents
+    # (e.g. a stray ---) load as None and are skipped.
+    with open(file_path, "rb", buffering=1 << 20) as file:
+        for document in yaml.load_all(file, Loader=SafeLoader):
+            if document is not None:
+                yield document
 
 
 def load_json_schema(file_path: str) -> Dict[str, Any]:
     try:
-        with open(file_path, "r") as file:
-            return json.load(file)
+        with open(file_path, "rb") as file:
+            return orjson.loads(file.read())
     except FileNotFoundError:
         raise Exception(f"File not found: {file_path}")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise Exception(f"Invalid JSON format in {file_path}: {e}")
 
 
+@functools.lru_cache(maxsize=8)
+def _load_schema_cached(file_path: str, mtime: int) -> Dict[str, Any]:
+    return load_json_schema(file_path)
+
+
+def _cached_schema(file_path: str) -> Dict[str, Any]:
+    # The mtime in the key makes an edited schema miss the cache
+    return _load_schema_cached(file_path, os.stat(file_path).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(schema_key: bytes) -> Callable[[Any], Any]:
+    # Generates a validator function specialised to this exact schema
+    return fastjsonschema.compile(orjson.loads(schema_key))
+
+
 def validate_config(config: Dict[str, Any], schema: Dict[str, Any]):
-    jsonschema.validate(instance=config, schema=schema)
+    # Key the cache on canonical bytes, so equal schemas share a validator
+    _compile(orjson.dumps(schema, option=orjson.OPT_SORT_KEYS))(config)
+
+
+def _extend(merged: Dict[str, Any], key: str, value: list):
+    merged.setdefault(key, []).extend(value)
+
+
+def _update(merged: Dict[str, Any], key: str, value: dict):
+    merged.setdefault(key, {}).update(value)
+
 
+def _set(merged: Dict[str, Any], key: str, value: Any):
+    merged[key] = value
 
-def merge_configs(configs: list[Dict[str, Any]]) -> Dict[str, Any]:
+
+TYPE_HANDLERS = {list: _extend, dict: _update}
+# Marks an exhausted config iterator; None could be a config in its own right
+_NO_CONFIG = object()
+
+
+def merge_configs(configs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    # Configs are folded in as they arrive, so a generator of documents is
+    # never held in memory all at once
+    configs = iter(configs)
+    first = next(configs, {})
+    second = next(configs, _NO_CONFIG)
+    if second is _NO_CONFIG:
+        # Nothing to merge; the result aliases the input rather than copying it
+        return first
     merged_config = {}
-    for config in configs:
+    for config in itertools.chain((first, second), configs):
         for key, value in config.items():
-            if isinstance(value, list):
-                if key not in merged_config:
-                    merged_config[key] = []
-                merged_config[key].extend(value)
-            elif isinstance(value, dict):
-                if key not in merged_config:
-                    merged_config[key] = {}
-                merged_config[key].update(value)
-            else:
-                merged_config[key] = value
+            TYPE_HANDLERS.get(type(value), _set)(merged_config, key, value)
     return merged_config
 
 
-def config_to_json(config: Dict[str, Any]) -> str:
-    return json.dumps(config)
+def config_to_json(config: Dict[str, Any]) -> bytes:
+    return orjson.dumps(config)
 
-def write_json_to_file(json_str: str, file_path: str):
-    with open(file_path, "w") as file:
-        file.write(json_str)
+def write_json_to_file(json_bytes: bytes, file_path: str):
+    with open(file_path, "wb") as file:
+        file.write(json_bytes)
 
 # Usage
-try:
-    schema = load_json_schema("schema.json")
-    config1 = load_yaml("config1.yaml")
-    #config2 = load_yaml("config2.yaml")
+if __name__ == "__main__":
+    try:
+        schema = _cached_schema("schema.json")
+        config1 = merge_configs(iter_yaml_documents("config1.yaml"))
+        #config2 = load_yaml("config2.yaml")
 
-    merged_config = merge_configs([config1])
-    validate_config(merged_config, schema)
+        merged_config = merge_configs([config1])
+        validate_config(merged_config, schema)
 
-    config_json = config_to_json(merged_config)
-    print(config_json)
-    write_json_to_file(config_json, "config.json")
+        config_json = config_to_json(merged_config)
+        print(config_json.decode())
+        write_json_to_file(config_json, "config.json")
 
-except Exception as e:
-    print(f"Error: {e}")
+    except Exception as e:
+        print(f"Error: {e}")
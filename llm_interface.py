@@ -1,15 +1,52 @@
-import json
+import asyncio
+import atexit
+import os
+import queue
+import threading
+
+import orjson
+
+# Seconds ollama keeps the model loaded after each call
+KEEP_ALIVE = 600
+# Final-chunk fields copied into the response; chunks are dicts on old ollama
+# releases and ChatResponse models from 0.4 on, and both support .get()
+RESPONSE_FIELDS = (
+    "model", "created_at", "done", "done_reason", "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+)
 
 class LLMInterface:
-    def __init__(self, client, model):
+    def __init__(self, client, model, debug=None, async_client=None):
         self.client = client
+        # Optional ollama.AsyncClient; without one the async calls fall back to threads
+        self.async_client = async_client
         self.model = model
+        # Set WORKSHOP_DEBUG to dump every raw response to llm_response.txt
+        self.debug = bool(os.environ.get("WORKSHOP_DEBUG")) if debug is None else debug
+        self._options = {"temperature": 0.7, "num_gpu": -1}
+        if self.debug:
+            # The dump is written on a worker thread, off the turn's critical path
+            self._dumps = queue.Queue()
+            self._dump_thread = threading.Thread(target=self._write_dumps, daemon=True)
+            self._dump_thread.start()
+            atexit.register(self.close)
+
+    def _write_dumps(self):
+        while (response := self._dumps.get()) is not None:
+            with open("llm_response.txt", "wb") as f:
+                f.write(orjson.dumps(response, option=orjson.OPT_INDENT_2))
 
-    def get_response(self, prompt, system_message="", get_tokens=False):
-        response = self.client.chat(
+    def close(self):
+        # Let the debug writer finish what is queued
+        if self.debug and self._dump_thread.is_alive():
+            self._dumps.put(None)
+            self._dump_thread.join()
+
+    def _chat_args(self, prompt, system_message):
+        return dict(
             model=self.model,
-            keep_alive=600,
-            options={"temperature": 0.7, "num_gpu": -1},
+            keep_alive=KEEP_ALIVE,
+            options=self._options,
             messages=[
                 {
                     "role": "system",
@@ -20,14 +57,47 @@ class LLMInterface:
                     "content": prompt,
                 },
             ],
+            stream=True,
         )
-        open("llm_response.txt", "w", encoding="utf-8").write(json.dumps(response, indent=4))
 
-        if 'prompt_eval_count' in response:
-            tokens = response['prompt_eval_count'] + response['eval_count']
-        else:
-            tokens = response['eval_count']
+    def warm_up(self):
+        # An empty prompt just loads the model, so the first real call doesn't wait for it
+        self.client.generate(model=self.model, prompt="", keep_alive=KEEP_ALIVE)
+
+    def stream_response(self, prompt, system_message=""):
+        # Yields chat chunks as ollama produces them; the last one carries the counts
+        return self.client.chat(**self._chat_args(prompt, system_message))
+
+    def get_response(self, prompt, system_message="", get_tokens=False, on_text=None):
+        # on_text, if given, is called with each piece of the reply as it arrives
+        parts = []
+        for chunk in self.stream_response(prompt, system_message):
+            text = chunk['message']['content']
+            parts.append(text)
+            if on_text is not None:
+                on_text(text)
+        return self._finish_response(chunk, parts, get_tokens)
+
+    def _finish_response(self, chunk, parts, get_tokens):
+        response = {key: chunk.get(key) for key in RESPONSE_FIELDS}
+        response['message'] = {'role': chunk['message']['role'], 'content': "".join(parts)}
+        if self.debug:
+            self._dumps.put(response)
 
         if get_tokens:
-            return response['message']['content'], tokens
-        return response
\ No newline at end of file
+            return response['message']['content'], self._count_tokens(response)
+        return response
+
+    @staticmethod
+    def _count_tokens(response):
+        # prompt_eval_count is None, not absent, on a prompt-cache hit
+        return (response.get('prompt_eval_count') or 0) + response['eval_count']
+
+    async def aget_response(self, prompt, system_message="", get_tokens=False):
+        if self.async_client is None:
+            # The sync ollama client blocks, so run it on a worker thread
+            return await asyncio.to_thread(self.get_response, prompt, system_message, get_tokens)
+        parts = []
+        async for chunk in await self.async_client.chat(**self._chat_args(prompt, system_message)):
+            parts.append(chunk['message']['content'])
+        return self._finish_response(chunk, parts, get_tokens)
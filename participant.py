@@ -1,12 +1,124 @@
 """ Participant module for the workshop"""
+import asyncio
+import atexit
+import threading
 from dataclasses import dataclass, field
 from llm_interface import LLMInterface
 import uuid
-import json
+import orjson
+import re
+from string import Template
 
-@dataclass
+# Prompt scaffolding is constant; only the $placeholders change per turn.
+_GUIDANCE = """\
+          [GUIDENCE]
+            - Always be concise and clear in your lines.
+            - Always stay true to your character.
+            - Always be mindful of the conversation 
+            - Always speak in the first person.
+            - Never break the fourth wall by mentioning the context or your persona explicitly.
+            - Never Stray from your character.
+            - Never Impersonate another participant.
+            - Never share more than one contribution.
+          [/GUIDENCE]
+"""
+
+_DEFAULT_PROMPT = Template("""
+          [CONTEXT]
+            This is you: $context
+            You are participating in this workshop: $workshop
+            Here is the transcript so far: $transcript
+          [/CONTEXT]
+
+          [INSTRUCTIONS]
+            It's your turn to shine. Contribute to the scene by asking a question, challenging a point, or making a comment relevant to the discussion.
+          [/INSTRUCTIONS]
+
+""" + _GUIDANCE + """
+        """)
+
+_CHECK_PROMPT = Template("""We have recived a response from $name, a workshop participate.
+        Here's the guidence we provided.
+""" + _GUIDANCE + """        
+        
+        Heres' the response:
+        [RESPONSE]
+        $response
+        [/RESPONSE]
+
+        You your task is do judge the response.
+        [TASK format=json]
+                If the response violates guidance, prefix you judgement with FAIL.
+                If the response is in compliance, prefix you judgement with PASS.
+        [/TASK]
+        """)
+
+# Cheap rule-based checks for the clear-cut guidance violations
+# Singular forms only, and case-sensitive, so "i" or "US" don't count; "we"
+# could be a narrator speaking for the group, so it is left to the LLM checker
+_FIRST_PERSON = re.compile(r"\b(I|I'm|I've|I'd|I'll|[Mm]e|[Mm]y|[Mm]ine)\b")
+_FOURTH_WALL = re.compile(
+    r"\b(as an AI|language model|my persona|as your persona|this role-?play)\b",
+    re.IGNORECASE,
+)
+# Clean replies up to this length are accepted without asking the LLM checker
+_SHORT_RESPONSE = 400
+
+
+def _static_guidance_check(response: str, name: str, speaker_names) -> bool | None:
+    """
+    Rule-based pass over the guidance.
+    Returns False on a clear violation, True for a short clean reply,
+    and None when only the LLM checker can judge it.
+    """
+    text = response.strip()
+    if not text or _FOURTH_WALL.search(text):
+        return False
+
+    labelled_lines = 0
+    for line in text.splitlines():
+        speaker, sep, _ = line.partition(":")
+        speaker = speaker.strip(" *")
+        if sep and speaker in speaker_names:
+            if speaker != name:
+                return False  # impersonating another participant
+            labelled_lines += 1
+    if labelled_lines > 1:
+        return False  # more than one contribution
+
+    if _FIRST_PERSON.search(text) and len(text) <= _SHORT_RESPONSE:
+        return True
+    return None
+
+
+_log_files = {}
+# /next all checks replies on worker threads, which share these handles
+_log_lock = threading.Lock()
+
+
+def _write_log(path: str, text: str):
+    """Append to a log file, opened once and reused for the whole run"""
+    with _log_lock:
+        log_file = _log_files.get(path)
+        if log_file is None:
+            log_file = _log_files[path] = open(path, "a", buffering=1 << 16, encoding="utf-8")
+        log_file.write(text)
+
+
+@atexit.register
+def _close_log_files():
+    with _log_lock:
+        for log_file in _log_files.values():
+            log_file.close()
+
+
+@dataclass(slots=True, eq=False)
 class Participant:
-    """Participant class for the workshop"""
+    """
+    Participant class for the workshop.
+    Participants compare and hash by identity (eq=False), not by field values,
+    so a restored copy is not equal to the original instance.
+    """
     name: str
     role: str
     background: str
@@ -15,78 +127,86 @@ class Participant:
     last_spoke_turn: int = 0
     mood: str = "neutral"
     prompts: list = field(default_factory=list)
-    uuid: str = field(default_factory=lambda: str(uuid.uuid4()))
-
+    uuid: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # Derived from name, role and background, which never change after
+    # construction. Slots leave no __dict__ for cached_property, so these
+    # are non-init fields filled in by __post_init__.
+    bio_short: str = field(init=False, repr=False, compare=False)
+    bio_full: str = field(init=False, repr=False, compare=False)
+    system_message: str = field(init=False, repr=False, compare=False)
+    _static_ctx: dict = field(init=False, repr=False, compare=False)
+    # to_dict result, dropped by the methods that change the participant
+    _dict_cache: dict | None = field(init=False, default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.bio_short = f"{self.name}, {self.role}"
+        self.bio_full = f"{self.name}, {self.role}. {self.background}"
+        self.system_message = f"You're persona is {self.name}, a willing participant in a workshop."
+        self._static_ctx = {"name": self.name, "role": self.role, "background": self.background}
+
+    def to_dict(self) -> dict:
+        """Serialisable state, i.e. the constructor arguments. Treat it as read-only."""
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "name": self.name,
+                "role": self.role,
+                "background": self.background,
+                "is_facilitator": self.is_facilitator,
+                "contributions": self.contributions,
+                "last_spoke_turn": self.last_spoke_turn,
+                "mood": self.mood,
+                "prompts": [dict(p) for p in self.prompts],
+                "uuid": self.uuid,
+            }
+        return self._dict_cache
 
     def add_prompt(self, name:str, prompt: str):
         """Add a prompt to the participant's prompts list"""
         self.prompts.append({"name": name, "prompt": prompt})
+        self._dict_cache = None
 
     def update_stats(self, current_turn):
         """Update the participant's stats based on the current turn"""
         self.contributions += 1
         self.last_spoke_turn = current_turn
+        self._dict_cache = None
 
     def generate_bio(self, full: bool = False) -> str:
         """Generate a bio for the participant"""
-        if full:
-            return f"{self.name}, {self.role}. {self.background}"
-        return f"{self.name}, {self.role}"
+        return self.bio_full if full else self.bio_short
 
     def get_context_for_llm(self) -> dict:
         """Get the context for the participant for the LLM"""
-        return {
-            "name": self.name,
-            "role": self.role,
-            "background": self.background,
-            "contributions": self.contributions,
-            "mood": self.mood
-        }
+        return {**self._static_ctx, "contributions": self.contributions, "mood": self.mood}
 
     def update_mood(self, new_mood: str):
         """Update the participant's mood based on the new mood"""
         self.mood = new_mood
+        self._dict_cache = None
 
     def turns_since_last_contribution(self, current_turn: int) -> int:
         """Calculate the number of turns since the last contribution"""
         return current_turn - self.last_spoke_turn
 
-    def generate_response(self, llm: LLMInterface, workshop_context: dict, transcript: list, prompt:str):
-        """Generate a response for the participant based on the LLM and the prompt"""
-        default_prompt = f"""
-          [CONTEXT]
-            This is you: {self.get_context_for_llm()}
-            You are participating in this workshop: {workshop_context}
-            Here is the transcript so far: {transcript}
-          [/CONTEXT]
-
-          [INSTRUCTIONS]
-            It's your turn to shine. Contribute to the scene by asking a question, challenging a point, or making a comment relevant to the discussion.
-          [/INSTRUCTIONS]
-
-          [GUIDENCE]
-            - Always be concise and clear in your lines.
-            - Always stay true to your character.
-            - Always be mindful of the conversation 
-            - Always speak in the first person.
-            - Never break the fourth wall by mentioning the context or your persona explicitly.
-            - Never Stray from your character.
-            - Never Impersonate another participant.
-            - Never share more than one contribution.
-          [/GUIDENCE]
-
+    def generate_response(self, llm: LLMInterface, workshop_context: str, transcript: str, prompt:str, speaker_names=(), on_text=None):
+        """
+        Generate a response for the participant based on the LLM and the prompt.
+        on_text receives the reply as it streams in, before it is checked.
         """
-
         if prompt is None:
-            prompt = default_prompt
-
-        response, tokens = llm.get_response(prompt, system_message=f"You're persona is {self.name}, a willing participant in a workshop.",get_tokens=True)
-        with open(f"state/participant_{self.name}_reponse.txt", "a") as f:
-          f.write(
-              f"Participant: {self.name}\nPrompt: {prompt}\nResponse: {response}"
-          )
-
-        check=self.check_reponse(llm, response, self.name)
+            prompt = _DEFAULT_PROMPT.substitute(
+                context=self.get_context_for_llm(),
+                workshop=workshop_context,
+                transcript=transcript,
+            )
+
+        response, tokens = llm.get_response(prompt, system_message=self.system_message,get_tokens=True, on_text=on_text)
+        _write_log(
+            f"state/participant_{self.name}_response.txt",
+            f"Participant: {self.name}\nPrompt: {prompt}\nResponse: {response}",
+        )
+
+        check=self.check_reponse(llm, response, self.name, speaker_names)
         if check:
             response = f"PASS: {response}"
         else:
@@ -95,41 +215,25 @@ class Participant:
 
         return response, tokens
     
-    def check_reponse(self, llm: LLMInterface, response: str, name: str) -> bool:
+    async def agenerate_response(self, llm: LLMInterface, workshop_context: str, transcript: str, prompt: str, speaker_names=()):
+        """Async variant of generate_response, runs the blocking LLM calls on a worker thread"""
+        return await asyncio.to_thread(self.generate_response, llm, workshop_context, transcript, prompt, speaker_names)
+
+    def check_reponse(self, llm: LLMInterface, response: str, name: str, speaker_names=()) -> bool:
         """Check if the response is relevant to the prompt"""
-        # use llm to chgeck the previous response is compliant with the prompt
-        prompt = f"""We have recived a response from {name}, a workshop participate.
-        Here's the guidence we provided.
-          [GUIDENCE]
-            - Always be concise and clear in your lines.
-            - Always stay true to your character.
-            - Always be mindful of the conversation 
-            - Always speak in the first person.
-            - Never break the fourth wall by mentioning the context or your persona explicitly.
-            - Never Stray from your character.
-            - Never Impersonate another participant.
-            - Never share more than one contribution.
-          [/GUIDENCE]
-        
-        
-        Heres' the response:
-        [RESPONSE]
-        {response}
-        [/RESPONSE]
+        verdict = _static_guidance_check(response, name, speaker_names)
+        if verdict is not None:
+            return verdict
 
-        You your task is do judge the response.
-        [TASK format=json]
-                If the response violates guidance, prefix you judgement with FAIL.
-                If the response is in compliance, prefix you judgement with PASS.
-        [/TASK]
-        """
+        # use llm to chgeck the previous response is compliant with the prompt
+        prompt = _CHECK_PROMPT.substitute(name=name, response=response)
 
         response, tokens = llm.get_response(prompt, system_message=f"You are a checker bot.",get_tokens=True)
         print("Checking")
-        with open(f"state/checker_reponse.txt", "a") as f:
-            f.write(json.dumps({"prompt": prompt, "response": response, "tokens": tokens}, indent=4))
+        _write_log(
+            "state/checker_response.txt",
+            orjson.dumps({"prompt": prompt, "response": response, "tokens": tokens}, option=orjson.OPT_INDENT_2).decode(),
+        )
 
-        if response.lstrip().lower()[:4] == "pass":
-            return True
-        else:
-            return False
\ No newline at end of file
+        # Fold only the 4-char prefix, not the whole reply
+        return response.lstrip()[:4].lower() == "pass"
\ No newline at end of file
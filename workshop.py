@@ -1,37 +1,161 @@
 """ Module to simulate a workshop session with large language models """
-import json
+import asyncio
+import bisect
+import itertools
+import os
+import queue
 import random
+import re
+import shlex
+import subprocess
 import sys
-from dataclasses import asdict
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-import jsonschema
+import orjson
 import yaml
-from ollama import Client, show as llmshow
-from rich import print as rprint
 from rich.console import Console
-from rich.pretty import Pretty
 from rich.prompt import Prompt
-from rich.progress import Progress
+from rich.style import Style
+from rich.text import Text
 from llm_interface import LLMInterface
 from participant import Participant
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
 
-@dataclass
+    warnings.warn("PyYAML was built without libyaml; using the pure-Python SafeLoader")
+
+
+@dataclass(slots=True, frozen=True)
 class TranscriptEntry:
     round: int
     turn: int
     participant_name: str
     content: str
+    # Text form, built once; orjson leaves underscored fields out of saves
+    _text: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_text", f"{self.participant_name} : {self.content}")
 
-    
     def __str__(self):
-        return f"{self.participant_name} : {self.content}"
+        return self._text
 
 console = Console()
 
+# Styles and headers for the screen, built once rather than parsed from markup per redraw
+TURN_STYLE = Style(color="blue")
+SPEAKER_STYLE = Style(color="blue", bold=True)
+TRANSCRIPT_HEADER = Text("Transcript:", style=Style(color="green", bold=True))
+FEEDBACK_HEADER = Text("\nControl Messages:", style=Style(color="red", bold=True))
+
+SCHEMA_FILE = "schema.json"
+
+# Recent turns are quoted verbatim in prompts; older ones are folded into a
+# rolling summary once at least SUMMARY_STEP of them have accumulated.
+TRANSCRIPT_WINDOW = 12
+SUMMARY_STEP = 8
+# How much of the transcript and control feedback the screen shows, and keeps
+DISPLAY_TRANSCRIPT_LINES = 20
+DISPLAY_FEEDBACK_LINES = 5
+# How much of a reply is previewed next to the spinner while it streams in
+STREAM_PREVIEW_CHARS = 60
+# Line between contributions in a /next batch reply
+BATCH_SEPARATOR = re.compile(r"^---\s*$", re.MULTILINE)
+# /util summerize compresses the transcript in blocks of this many lines, concurrently
+SUMMARY_CHUNK_LINES = 40
+
+
+# Transcript entries are saved one JSON object per line in a sidecar next to
+# the state file, so a save only appends the turns taken since the last one.
+# Sidecar path -> (transcript epoch, entries written) for this process.
+_sidecar_written: Dict[str, tuple] = {}
+_sidecar_lock = threading.Lock()
+_transcript_epochs = itertools.count()
+
+
+def transcript_sidecar(filename: str) -> str:
+    """ Path of the transcript file that goes with a state file """
+    return f"{os.path.splitext(filename)[0]}.transcript.ndjson"
+
+
+def _sync(f):
+    f.flush()
+    getattr(os, "fdatasync", os.fsync)(f.fileno())
+
+
+def write_transcript_sidecar(entries: List["TranscriptEntry"], epoch: int, filename: str, durable: bool = False):
+    """
+    Bring the sidecar up to date with entries, appending when it already holds
+    a prefix of this transcript and rewriting it otherwise.
+    """
+    with _sidecar_lock:
+        written_epoch, written = _sidecar_written.get(filename, (None, 0))
+        if written_epoch == epoch and written <= len(entries):
+            with open(filename, "ab") as f:
+                f.writelines(orjson.dumps(entry) + b"\n" for entry in entries[written:])
+                if durable:
+                    _sync(f)
+        else:
+            # First write this session, or a different transcript after a restore
+            tmp_filename = f"{filename}.tmp"
+            with open(tmp_filename, "wb") as f:
+                f.writelines(orjson.dumps(entry) + b"\n" for entry in entries)
+                if durable:
+                    _sync(f)
+            os.replace(tmp_filename, filename)
+        _sidecar_written[filename] = (epoch, len(entries))
+
+
+def write_state_file(state: Dict[str, Any], filename: str, durable: bool = False):
+    """
+    Atomically replace filename with the serialised state, and update its
+    transcript sidecar first so the state never refers to missing entries.
+    With durable, the data is synced to disk before the rename; interim
+    autosaves skip that, as the next one follows shortly anyway.
+    """
+    state = dict(state)
+    entries = state.pop("transcript_content")
+    write_transcript_sidecar(entries, state.pop("transcript_epoch"), transcript_sidecar(filename), durable)
+    state["transcript_length"] = len(entries)
+
+    # Participants go through to_dict to leave out derived fields
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        if durable:
+            _sync(f)
+    os.replace(tmp_filename, filename)
+
+
+def read_transcript_sidecar(filename: str, length: int) -> List["TranscriptEntry"]:
+    """ The first length entries of a transcript sidecar """
+    with open(filename, "rb") as f:
+        return [TranscriptEntry(**orjson.loads(line)) for line in itertools.islice(f, length)]
+
+
+def split_command(text: str) -> List[str]:
+    """
+    Split a command line into words, keeping "double quoted" text together.
+    Single quotes are left alone, as apostrophes are common in /say lines,
+    and so are backslashes, so Windows paths pass through unchanged.
+    """
+    lexer = shlex.shlex(text, posix=True)
+    lexer.whitespace_split = True
+    lexer.quotes = '"'
+    lexer.escape = ""
+    lexer.commenters = ""
+    return list(lexer)
 
 
 class WorkshopState(Enum):
@@ -46,84 +170,197 @@ class Workshop:
     def __init__(self, llm_client, context_length=4000):
         self.llm = llm_client
         self.transcript_entries: List[TranscriptEntry] = []
-        self.control_feedback: List[str] = []
+        # Changes whenever transcript_entries is replaced rather than appended to
+        self._transcript_epoch: int = next(_transcript_epochs)
+        # str() of each entry, built once on append, for assembling prompts
+        self._transcript_lines: List[str] = []
+        # How many of those lines are already in latest_transcript.txt
+        self._transcript_written_count: int = 0
+        # latest_transcript.txt, kept open between redraws
+        self._transcript_file = None
+        # The entries on screen; the full transcript stays in transcript_entries
+        self._transcript_tail: deque = deque(maxlen=DISPLAY_TRANSCRIPT_LINES)
+        self.control_feedback: deque = deque(maxlen=DISPLAY_FEEDBACK_LINES)
+        # Messages from background threads, moved into control_feedback on the
+        # main thread so the deque is never changed while it is being drawn
+        self._thread_feedback: queue.SimpleQueue = queue.SimpleQueue()
         self.global_config: Dict[str, Any] = {}
         self.participants: List[Participant] = []
         self.facilitator: Participant = None
         self.current_participant_index: int = -1
+        # Position in self.participants of the last speaker picked by rotation
+        self.rotation_index: int = -1
         self.state: WorkshopState = WorkshopState.NOT_STARTED
         self.previous_participant: Participant = None
         self.current_turn: int = 0
         self.tokens_used: int = 0
         self.context_length : int = context_length
         self.current_round : int= 0
+        self.transcript_summary: str = ""
+        self.summary_covers: int = 0
+        self._validator = None
+        self._required_keys: tuple = ()
+        self._schema_mtime: int = 0
+        # Rendered /show output, reset whenever global_config changes
+        self._pretty_config_cache: Optional[str] = None
+        # global_config as embedded in prompts, reset along with the above
+        self._config_text: Optional[str] = None
+        # Set by anything that changes the saved state (config, participants,
+        # transcript, session state), cleared by the AutoSaver. Feedback-only
+        # commands such as /show and /backup leave it alone.
+        self.dirty: bool = False
+        # Sorted lowercase names and their participants, for prefix lookup
+        self._name_keys: List[str] = []
+        self._name_owners: List[Participant] = []
+        self._by_name_lower: Dict[str, Participant] = {}
+        self._by_uuid: Dict[str, Participant] = {}
+        # One loop for the whole session, so an async LLM client keeps its connection pool
+        self._loop = asyncio.new_event_loop()
+        # Command name to handler; each handler takes the argument list
+        self._commands = {
+            "load": self.handle_load_command,
+            "show": self.handle_show_command,
+            "start": self.handle_start_command,
+            "say": self.handle_say_command,
+            "next": self.handle_next_command,
+            "end": lambda args: self.handle_endsession_command(),
+            "util": self.handle_util_command,
+            "backup": self.handle_backup_command,
+            "restore": self.handle_restore_command,
+            "view_transcript": self.handle_view_transcript_command,
+            "exit": lambda args: self.handle_exit_command(),
+        }
         
     
-    def get_transcript(self) -> str:
+    def get_prompt_transcript(self) -> str:
         """
-        Retrieves the full transcript as a JSON payload.
+        Builds the transcript text embedded in LLM prompts.
+        Older turns are replaced by a rolling summary so the prompt stays
+        bounded instead of growing with every turn.
         Returns:
-            str: The full transcript as a JSON string.
+            str: The summary (if any) followed by the recent turns, one per line.
         """
-        transcript_data = [
-            {
-                "round": entry.round,
-                "turn": entry.turn,
-                "participant": entry.participant_name,
-                "content": entry.content
-            }
-            for entry in self.transcript_entries
-        ]
-        return json.dumps(transcript_data, indent=2)
+        older = len(self.transcript_entries) - TRANSCRIPT_WINDOW
+        if older - self.summary_covers >= SUMMARY_STEP:
+            self.update_transcript_summary(older)
+
+        recent = "\n".join(self._transcript_lines[self.summary_covers:])
+        if self.transcript_summary:
+            return f"Summary of the earlier discussion: {self.transcript_summary}\n{recent}"
+        return recent
+
+    def update_transcript_summary(self, upto: int):
+        """ Fold transcript entries before index `upto` into the rolling summary """
+        new_lines = "\n".join(self._transcript_lines[self.summary_covers:upto])
+        self.transcript_summary = self.run_async(
+            self.summarize(f"{self.transcript_summary}\n{new_lines}")
+        )
+        self.summary_covers = upto
+
+    def append_transcript_entry(self, entry: TranscriptEntry):
+        """ Add an entry to the transcript, keeping the prompt line cache in step """
+        self.transcript_entries.append(entry)
+        self._transcript_tail.append(entry)
+        self._transcript_lines.append(str(entry))
+        self.dirty = True
+
+    def get_config_text(self) -> str:
+        """
+        The config as it appears in prompts, rendered once per change.
+        Block-style YAML drops the quotes and brackets of JSON, which saves
+        prompt tokens on every turn.
+        """
+        if self._config_text is None:
+            self._config_text = yaml.dump(
+                self.global_config, Dumper=SafeDumper,
+                sort_keys=False, default_flow_style=False, allow_unicode=True,
+            )
+        return self._config_text
+
+    def config_changed(self):
+        """ Drop everything rendered from global_config; call after changing it """
+        self._pretty_config_cache = None
+        self._config_text = None
+        self.dirty = True
+
+    def get_speaker_names(self) -> List[str]:
+        """ Names of everyone who can speak, used to spot impersonation """
+        names = [p.name for p in self.participants]
+        if self.facilitator:
+            names.append(self.facilitator.name)
+        return names
 
     def get_state(self) -> WorkshopState:
         """ Getter for the workshop state """
         return self.state
 
-    def save_state(self, filename: str = "workshop_state.json"):
-        """ Save the state to JSON, in a restartable format """
-        state = {
-            "transcript_content": [asdict(t) for t in self.transcript_entries],
-            "control_feedback": self.control_feedback,
+    def get_state_snapshot(self) -> Dict[str, Any]:
+        """ Restartable copy of the state, safe to serialise on another thread """
+        return {
+            "transcript_content": list(self.transcript_entries),
+            "transcript_epoch": self._transcript_epoch,
+            "control_feedback": list(self.control_feedback),
             "global_config": self.global_config,
-            "participants": [asdict(p) for p in self.participants],
-            "facilitator": asdict(self.facilitator) if self.facilitator else None,
+            "participants": [p.to_dict() for p in self.participants],
+            "facilitator": self.facilitator.to_dict() if self.facilitator else None,
             "current_participant_index": self.current_participant_index,
+            "rotation_index": self.rotation_index,
             "state": self.state.value,
             "previous_participant": (
-                asdict(self.previous_participant) if self.previous_participant else None
+                self.previous_participant.to_dict() if self.previous_participant else None
             ),
             "current_turn": self.current_turn,
             "tokens_used": self.tokens_used,
             "context_length": self.context_length,
             "current_round": self.current_round,
+            "transcript_summary": self.transcript_summary,
+            "summary_covers": self.summary_covers,
         }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=2)
+
+    def save_state(self, filename: str = "workshop_state.json", durable: bool = False):
+        """ Save the state to JSON, in a restartable format """
+        write_state_file(self.get_state_snapshot(), filename, durable)
 
     def load_state(self, filename: str = "workshop_state.json"):
         """ Load the state from JSON """
-        with open(filename, "r", encoding="utf-8") as f:
-            state = json.load(f)
+        with open(filename, "rb") as f:
+            state = orjson.loads(f.read())
 
-        self.transcript_entries = [TranscriptEntry(**t) for t in state["transcript_content"]]
-        self.control_feedback = state["control_feedback"]
+        if "transcript_content" in state:
+            # Saved before transcripts moved to a sidecar
+            self.transcript_entries = [TranscriptEntry(**t) for t in state["transcript_content"]]
+        else:
+            self.transcript_entries = read_transcript_sidecar(
+                transcript_sidecar(filename), state["transcript_length"]
+            )
+        self._transcript_epoch = next(_transcript_epochs)
+        self._transcript_lines = [str(entry) for entry in self.transcript_entries]
+        self.close_transcript_file()  # rewritten in full on the next sync
+        self._transcript_tail = deque(self.transcript_entries, maxlen=DISPLAY_TRANSCRIPT_LINES)
+        self.control_feedback = deque(state["control_feedback"], maxlen=DISPLAY_FEEDBACK_LINES)
         self.global_config = state["global_config"]
+        self.config_changed()
         self.participants = [Participant(**p) for p in state["participants"]]
         self.facilitator = (
             Participant(**state["facilitator"]) if state["facilitator"] else None
         )
+        self.index_participants()
         self.current_participant_index = state["current_participant_index"]
+        self.rotation_index = state.get("rotation_index", -1)
         self.state = WorkshopState(state["state"])
+        # The previous speaker is saved as a copy; point back at the live instance
+        previous = state["previous_participant"]
         self.previous_participant = (
-            Participant(**state["previous_participant"])
-            if state["previous_participant"]
+            self._by_uuid.get(previous["uuid"]) or Participant(**previous)
+            if previous
             else None
         )
         self.current_turn = state["current_turn"]
         self.tokens_used = state["tokens_used"]
         self.context_length = state["context_length"]
         self.current_round = state["current_round"]
+        self.transcript_summary = state.get("transcript_summary", "")
+        self.summary_covers = state.get("summary_covers", 0)
 
     def extract_participants(self):
         """ Extract participants from the configuration and instantiate as objects """
@@ -149,70 +386,85 @@ class Workshop:
                 self.facilitator.is_facilitator = True
 
         random.shuffle(self.participants)
+        self.rotation_index = -1
+        self.index_participants()
+
+    def index_participants(self):
+        """ Rebuild the name and uuid indexes; call whenever the participants change """
+        index = sorted((p.name.lower(), i) for i, p in enumerate(self.participants))
+        self._name_keys = [key for key, _ in index]
+        self._name_owners = [self.participants[i] for _, i in index]
+        self._by_name_lower = dict(zip(self._name_keys, self._name_owners))
+        self._by_uuid = {p.uuid: p for p in self.participants}
+        if self.facilitator:
+            self._by_uuid[self.facilitator.uuid] = self.facilitator
 
     def load_yaml(self, file_path: str) -> Dict[str, Any]:
         """ Load YAML config file to build a full config """
-        with open(file_path, "r", encoding="utf-8") as file:
-            return yaml.safe_load(file)
+        # Bytes go straight to libyaml, which does its own UTF-8 decoding
+        with open(file_path, "rb") as file:
+            return yaml.load(file, Loader=SafeLoader)
 
     def load_json_schema(self, file_path: str) -> Dict[str, Any]:
         """ Load JSON schema file to validate the config """
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return json.load(file)
+            with open(file_path, "rb") as file:
+                return orjson.loads(file.read())
         except FileNotFoundError:
             raise Exception(f"File not found: {file_path}")
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             raise Exception(f"Invalid JSON format in {file_path}: {e}")
 
-    def validate_config(self, config: Dict[str, Any], schema: Dict[str, Any]):
-        """ Validate the config against the schema """
-        jsonschema.validate(instance=config, schema=schema)
-
-    def merge_configs(self, configs: list[Dict[str, Any]]) -> Dict[str, Any]:
-        """ Merge multiple configs into one """
-        merged_config = {}
-        for config in configs:
-            for key, value in config.items():
-                if isinstance(value, list):
-                    if key not in merged_config:
-                        merged_config[key] = []
-                    merged_config[key].extend(value)
-                elif isinstance(value, dict):
-                    if key not in merged_config:
-                        merged_config[key] = {}
-                    merged_config[key].update(value)
-                else:
-                    merged_config[key] = value
-        return merged_config
+    def validate_config(self, config: Dict[str, Any]):
+        """ Validate the config against the schema, compiled on first use and whenever the file changes """
+        mtime = os.stat(SCHEMA_FILE).st_mtime_ns
+        if self._validator is None or mtime != self._schema_mtime:
+            import fastjsonschema  # deferred: only needed once a config is loaded
+
+            schema = self.load_json_schema(SCHEMA_FILE)
+            self._validator = fastjsonschema.compile(schema)
+            self._required_keys = tuple(schema.get("required", ()))
+            # Recorded last, so a schema that fails to load is retried next time
+            self._schema_mtime = mtime
+        # Name every missing top-level section at once, before the full walk
+        missing = [key for key in self._required_keys if key not in config]
+        if missing:
+            raise Exception(f"Config is missing required sections: {', '.join(missing)}")
+        self._validator(config)
+
+    def merge_into(self, dst: Dict[str, Any], src: Dict[str, Any]):
+        """
+        Merge src into dst, visiting only the keys in src: lists are
+        concatenated, dicts merged recursively, anything else replaced.
+        Containers already in dst are replaced rather than changed, so dst
+        can be a shallow copy of a config that must stay as it was.
+        """
+        # YAML and JSON only produce plain lists and dicts, so exact type checks do
+        for key, value in src.items():
+            current = dst.get(key)
+            if type(value) is list and type(current) is list:
+                dst[key] = current + value
+            elif type(value) is dict and type(current) is dict:
+                merged = dict(current)
+                self.merge_into(merged, value)
+                dst[key] = merged
+            else:
+                dst[key] = value
 
     def handle_command(self, command):
         """ main command handler """
         if command.startswith("/"):
-            parts = command[1:].split()
-            cmd = parts[0]
+            try:
+                parts = split_command(command[1:])
+            except ValueError as e:
+                self.control_feedback.append(f"Could not parse command: {e}")
+                return
+            cmd = parts[0] if parts else ""
             args = parts[1:]
 
-            if cmd == "load":
-                self.handle_load_command(args)
-            elif cmd == "show":
-                self.handle_show_command(args)
-            elif cmd == "start":
-                self.handle_start_command(args)
-            elif cmd == "say":
-                self.handle_say_command(args)
-            elif cmd == "next":
-                self.handle_next_command(args)
-            elif cmd == "end":
-                self.handle_endsession_command()
-            elif cmd == "util":
-                self.handle_util_command(args)
-            elif cmd == "backup":
-                self.handle_backup_command(args)
-            elif cmd == "restore":
-                self.handle_restore_command(args)
-            elif cmd == "exit":
-                self.handle_exit_command()
+            handler = self._commands.get(cmd)
+            if handler:
+                handler(args)
             else:
                 self.control_feedback.append("Unknown command")
         else:
@@ -263,30 +515,43 @@ class Workshop:
 
     def handle_load_command(self, args):
         """ Handle commands """
-        if len(args) == 1:
-            filename = args[0]
-            try:
-                new_config = self.load_yaml(filename)
-                merged_config = self.merge_configs([self.global_config, new_config])
-                schema = self.load_json_schema("schema.json")
-                self.validate_config(merged_config, schema)
-                self.global_config.update(merged_config)
+        if not args:
+            self.control_feedback.append("Usage: /load [filename ...]")
+            return
 
-                self.control_feedback.append(
-                    f"Configuration file '{filename}' loaded and merged."
-                )
-            except Exception as e:
-                self.control_feedback.append(
-                    f"Error loading configuration file '{filename}': {e}"
-                )
-        else:
-            self.control_feedback.append("Usage: /load [filename]")
+        files = "s" if len(args) > 1 else ""
+        names = ", ".join(f"'{filename}'" for filename in args)
+        try:
+            if len(args) == 1:
+                new_configs = [self.load_yaml(args[0])]
+            else:
+                # Reads overlap across threads; merged below in the order given
+                with ThreadPoolExecutor(max_workers=min(8, len(args))) as pool:
+                    new_configs = list(pool.map(self.load_yaml, args))
+            # Only the candidate changes, so a config that fails validation leaves no trace
+            merged_config = dict(self.global_config)
+            for new_config in new_configs:
+                self.merge_into(merged_config, new_config)
+            self.validate_config(merged_config)
+            self.global_config = merged_config
+            self.config_changed()
+
+            self.control_feedback.append(
+                f"Configuration file{files} {names} loaded and merged."
+            )
+        except Exception as e:
+            self.control_feedback.append(
+                f"Error loading configuration file{files} {names}: {e}"
+            )
 
     def handle_show_command(self, args):
         """ Handle commands """
+        if self._pretty_config_cache is None:
+            from rich.pretty import pretty_repr  # deferred: only /show needs it
+
+            self._pretty_config_cache = pretty_repr(self.global_config)
         self.control_feedback.append("Current configuration:")
-        pretty_config = Pretty(self.global_config)
-        self.control_feedback.append(pretty_config)
+        self.control_feedback.append(self._pretty_config_cache)
 
     def handle_start_command(self, args):
         """ Start the workshop """
@@ -308,16 +573,16 @@ class Workshop:
             )
             return
 
-        prompt = (
-            " ".join(args)
-            if args
-            else f"Let's begin our workshop session. {self.global_config['workshop']}"
-        )
         self.control_feedback.append(
             "Workshop started. Use /next to proceed with turns."
         )
         self.state = WorkshopState.STARTED
-        self.take_facilitator_turn(prompt)
+        self.dirty = True
+        if args:
+            # An opening line is delivered like /say
+            self.handle_say_command(args)
+        else:
+            self.take_facilitator_turn()
 
     def handle_say_command(self, args):
         """ Say something to the participants as facilitor """
@@ -326,8 +591,8 @@ class Workshop:
 
             prompt = f"""
             [CONTEXT]
-                You are participating in a workshop as facilitator, here are the details {self.global_config}
-                Here is the transcript so far : {self.get_transcript()}
+                You are participating in a workshop as facilitator, here are the details {self.get_config_text()}
+                Here is the transcript so far : {self.get_prompt_transcript()}
               [/CONTEXT]
               [INSTRUCTIONS]
                 Say this '{content}' in your voice.
@@ -349,6 +614,18 @@ class Workshop:
             )
             return
 
+        if args and args[0] == "all":
+            self.take_group_turn()
+            return
+
+        if args and args[0] == "batch":
+            if len(args) > 2 or (len(args) == 2 and not args[1].isdigit()):
+                self.control_feedback.append("Usage: /next batch [N]")
+                return
+            count = int(args[1]) if len(args) == 2 else len(self.participants)
+            self.take_batch_turn(count)
+            return
+
         # Default behavior: take 1 turn or auto run a few turns
         turn_to_take = 1
         if args and args[0].isdigit():
@@ -358,13 +635,8 @@ class Workshop:
         next_participant = None
         for _ in range(turn_to_take):
             if not args:
-                # Default behavior: pick random but not last
-                available_participants = [
-                    p for p in self.participants if p != self.previous_participant
-                ]
-                if not available_participants:
-                    available_participants = self.participants
-                next_participant = random.choice(available_participants)
+                # Default behavior: next in the shuffled rotation, but not last
+                next_participant = self.next_in_rotation()
             elif args[0] == "?":
                 # Use LLM to determine who should be next
                 next_participant = self.llm_pick_participant()
@@ -376,27 +648,41 @@ class Workshop:
             if next_participant:
                 self.take_participant_turn(next_participant)
 
+    def next_in_rotation(self):
+        """ Advance through the roster in its shuffled order, skipping the last speaker """
+        count = len(self.participants)
+        if not count:
+            return None
+        for _ in range(2):
+            self.rotation_index = (self.rotation_index + 1) % count
+            participant = self.participants[self.rotation_index]
+            if participant is not self.previous_participant:
+                break
+        return participant
+
     def pick_participant_by_name(self, name):
         """ Pick the next participant based on a name """
-        next_participant = None
-        matching_participants = [
-            p for p in self.participants if p.name.lower().startswith(name.lower())
-        ]
-        if matching_participants:
-            next_participant = matching_participants[0]
-        else:
-            self.control_feedback.append(
-                f"No participant found whose name starts with '{name}'"
-            )
+        key = name.lower()
+        # Full names, as the LLM suggests them, need no search
+        exact = self._by_name_lower.get(key)
+        if exact is not None:
+            return exact
+        # Any name with this prefix sorts at or just after the prefix itself
+        pos = bisect.bisect_left(self._name_keys, key)
+        if pos < len(self._name_keys) and self._name_keys[pos].startswith(key):
+            return self._name_owners[pos]
 
-        return next_participant
+        self.control_feedback.append(
+            f"No participant found whose name starts with '{name}'"
+        )
+        return None
 
     def llm_pick_participant(self):
         """ Pick the next participant based assessment of the conversation flow """
         prompt = f"""
         [CONTEXT]
-          You are an AI assistant helping to manage a workshop. Here are the workshop details: {self.global_config}
-          Here is the transcript so far: {self.get_transcript()}
+          You are an AI assistant helping to manage a workshop. Here are the workshop details: {self.get_config_text()}
+          Here is the transcript so far: {self.get_prompt_transcript()}
         [/CONTEXT]
         [INSTRUCTIONS]
           Based on the conversation flow and content, suggest which participant should speak next.
@@ -414,11 +700,13 @@ class Workshop:
           - Any other response format will fail.
         [/CONSTRAINTS]
         """
-        suggestion = self.llm.get_response(
+        suggestion, _ = self.llm.get_response(
             prompt=prompt,
-            system_message=f"You analyse conversations and provide a single name.",get_tokens=False,
+            system_message=f"You analyse conversations and provide a single name.",get_tokens=True,
         )
-        suggested_name = suggestion.split("Next speaker:")[-1].strip()
+        # Text after the last marker, or the whole reply if the model left it out
+        _, _, suggested_name = suggestion.rpartition("Next speaker:")
+        suggested_name = suggested_name.strip(" \n'\"*")
 
         next_participant = self.pick_participant_by_name(suggested_name)
         return next_participant or None
@@ -427,13 +715,26 @@ class Workshop:
         """ End the workshop """
         self.control_feedback.append("Workshop session ended.")
         self.state = WorkshopState.ENDING
-
-    # def handle_view_transcript_command(self):
-    #     self.control_feedback.append("Opening full transcript...")
-    #     transcript_file = Path("transcript.txt")
-    #     with transcript_file.open("w") as f:
-    #         f.write("\n".join(self.transcript_content))
-    #     os.system(f"notepad {transcript_file}")
+        self.dirty = True
+
+    def handle_view_transcript_command(self, args):
+        """ Open the full transcript in an editor """
+        self.control_feedback.append("Opening full transcript...")
+        # latest_transcript.txt already holds every line; just catch it up
+        self.sync_transcript_file()
+        transcript_file = Path("latest_transcript.txt")
+        try:
+            if sys.platform == "win32":
+                # A separate window, so the workshop carries on while it is open
+                subprocess.Popen(["notepad.exe", str(transcript_file)], close_fds=True)
+            elif os.environ.get("EDITOR"):
+                # Terminal editors need the terminal, so wait for them to exit
+                subprocess.run([*shlex.split(os.environ["EDITOR"]), str(transcript_file)])
+            else:
+                opener = "open" if sys.platform == "darwin" else "xdg-open"
+                subprocess.Popen([opener, str(transcript_file)], close_fds=True)
+        except OSError as e:
+            self.control_feedback.append(f"Could not open {transcript_file}: {e}")
 
     # def get_responsefrom_llm(self, prompt, participant):
     #     response = self.llm_client.get_response(prompt=prompt, system_message=f"You're persona is {participant}.")
@@ -444,30 +745,53 @@ class Workshop:
 
     #     return response["message"]["content"]
 
-    def take_facilitator_turn(self, prompt):
-        """ Take the facilitator turn"""
+    @contextmanager
+    def speaking(self, speaker: Participant):
+        """
+        Spinner for a speaker's turn. Yields a callback for the streamed reply,
+        whose latest words are shown next to the spinner as they arrive.
+        """
+        label = f"{speaker.name} ({speaker.role}) thinking"
+        with console.status(label, spinner="dots") as status:
+            preview = ""
+
+            def on_text(text: str):
+                nonlocal preview
+                preview = (preview + text.replace("\n", " "))[-STREAM_PREVIEW_CHARS:]
+                # Text, not markup: the reply may contain square brackets
+                status.update(Text.assemble(label, ": ", (preview, "dim")))
+
+            yield on_text
+
+    def take_facilitator_turn(self, prompt: Optional[str] = None):
+        """ Take the facilitator turn, steering the conversation unless given a prompt """
         self.previous_participant = self.facilitator
+        self.current_participant_index = -1
         self.current_turn += 1
-        prompt = f"""
-        [CONTEXT]
-          You are the workshop facilitator!
-          Here are the workshop details: {self.global_config}
-          Here is the transcript so far: {self.get_transcript()}
-        [/CONTEXT]
-        [INSTRUCTIONS]
-          Review the transcript and the goals.
-          Use your skill to ask open-ended questions to keep the conversation flow going.
-        [/INSTRUCTIONS]
-        """
+        if prompt is None:
+            transcript = self.get_prompt_transcript()
+            prompt = f"""
+            [CONTEXT]
+              You are the workshop facilitator!
+              Here are the workshop details: {self.get_config_text()}
+              Here is the transcript so far: {transcript}
+            [/CONTEXT]
+            [INSTRUCTIONS]
+              Review the transcript and the goals.
+              Use your skill to ask open-ended questions to keep the conversation flow going.
+            [/INSTRUCTIONS]
+            """
 
-        with console.status(f"{self.facilitator.name} ({self.facilitator.role}) thinking", spinner="dots") as status:
+        with self.speaking(self.facilitator) as on_text:
+            # The transcript is only needed to build a prompt, which is already done
             response, tokens = self.facilitator.generate_response(
-                self.llm, self.global_config, self.get_transcript(), prompt=prompt,
+                self.llm, self.get_config_text(), "", prompt=prompt,
+                speaker_names=self.get_speaker_names(), on_text=on_text,
             )
 
 
         entry=TranscriptEntry(self.current_round,self.current_turn,self.facilitator.name,content=response)
-        self.transcript_entries.append(entry)
+        self.append_transcript_entry(entry)
         self.control_feedback.append(
             f"{self.facilitator.name} (F) has spoken. Use /next to continue."
         )
@@ -479,77 +803,284 @@ class Workshop:
             return
 
         self.previous_participant = participant
+        self.current_participant_index = self.participants.index(participant)
         self.current_turn += 1
         participant.update_stats(self.current_turn)
 
-        with console.status(f"{participant.name} ({participant.role}) thinking", spinner="dots") as status:
-            participant_response, tokens = participant.generate_response(llm=self.llm, workshop_context=self.global_config, transcript=self.get_transcript(), prompt=None)
+        with self.speaking(participant) as on_text:
+            participant_response, tokens = participant.generate_response(llm=self.llm, workshop_context=self.get_config_text(), transcript=self.get_prompt_transcript(), prompt=None, speaker_names=self.get_speaker_names(), on_text=on_text)
         
         entry=TranscriptEntry(self.current_round,self.current_turn,participant.name,participant_response)
-        self.transcript_entries.append(entry)
+        self.append_transcript_entry(entry)
 
         self.control_feedback.append(
             f"{participant.name} has spoken. Use /next to continue."
         )
         self.tokens_used = tokens
 
+    def take_batch_turn(self, count: int):
+        """
+        Take the next count rotation turns with a single LLM call, each reply
+        still going through its speaker's guidance check. Falls back to one
+        call per turn if the reply can't be split into the expected turns.
+        At most one turn per participant is batched.
+        """
+        speakers = []
+        for _ in range(min(count, len(self.participants))):
+            speaker = self.next_in_rotation()
+            if speaker is None:
+                break
+            speakers.append(speaker)
+            self.previous_participant = speaker  # so the rotation won't pick them twice running
+        if not speakers:
+            return
+
+        roster = "\n".join(f"            - {speaker.generate_bio(full=True)}" for speaker in speakers)
+        prompt = f"""
+        [CONTEXT]
+          Here are the workshop details: {self.get_config_text()}
+          These participants speak next, in this order:
+{roster}
+          Here is the transcript so far: {self.get_prompt_transcript()}
+        [/CONTEXT]
+        [INSTRUCTIONS]
+          Write the next {len(speakers)} contributions to the workshop, one for each participant above, in that order.
+          Each participant speaks in the first person, stays in character, and makes a single contribution.
+          Start each contribution with the participant's name followed by a colon.
+          Put a line containing only --- between contributions.
+        [/INSTRUCTIONS]
+        """
+        with console.status(f"{len(speakers)} participants thinking", spinner="dots"):
+            response, tokens = self.llm.get_response(
+                prompt=prompt,
+                system_message="You voice several workshop participants, each true to their persona.",
+                get_tokens=True,
+            )
+
+        parts = [part.strip() for part in BATCH_SEPARATOR.split(response) if part.strip()]
+        replies = []
+        for speaker, part in zip(speakers, parts):
+            name, sep, reply = part.partition(":")
+            # Models often bold the name (**Name**: or **Name:**) or change its case
+            if not sep or name.strip(" *").casefold() != speaker.name.casefold():
+                break
+            replies.append(reply.lstrip(" *").strip())
+        if len(parts) != len(speakers) or len(replies) != len(speakers):
+            self.control_feedback.append("Batch reply didn't split into turns; taking them one at a time.")
+            for speaker in speakers:
+                self.take_participant_turn(speaker)
+            self.tokens_used += tokens  # the batch call was spent all the same
+            return
+
+        speaker_names = self.get_speaker_names()
+        for speaker, reply in zip(speakers, replies):
+            verdict = "PASS" if speaker.check_reponse(self.llm, reply, speaker.name, speaker_names) else "FAIL"
+            self.current_turn += 1
+            speaker.update_stats(self.current_turn)
+            self.current_participant_index = self.participants.index(speaker)
+            self.append_transcript_entry(
+                TranscriptEntry(self.current_round, self.current_turn, speaker.name, f"{verdict}: {reply}")
+            )
+        self.tokens_used = tokens
+        self.control_feedback.append(
+            f"{len(speakers)} participants have spoken. Use /next to continue."
+        )
+
+    def take_group_turn(self):
+        """ Every participant responds to the same transcript, concurrently """
+        if not self.participants:
+            return
+
+        transcript = self.get_prompt_transcript()
+        speaker_names = self.get_speaker_names()
+
+        async def gather_responses():
+            return await asyncio.gather(*[
+                p.agenerate_response(llm=self.llm, workshop_context=self.get_config_text(), transcript=transcript, prompt=None, speaker_names=speaker_names)
+                for p in self.participants
+            ])
+
+        with console.status(f"{len(self.participants)} participants thinking", spinner="dots"):
+            responses = self.run_async(gather_responses())
+
+        for participant, (participant_response, tokens) in zip(self.participants, responses):
+            self.current_turn += 1
+            participant.update_stats(self.current_turn)
+            entry=TranscriptEntry(self.current_round,self.current_turn,participant.name,participant_response)
+            self.append_transcript_entry(entry)
+            self.tokens_used = tokens
+
+        self.previous_participant = self.participants[-1]
+        self.current_participant_index = len(self.participants) - 1
+        self.control_feedback.append(
+            "All participants have spoken. Use /next to continue."
+        )
+
+    def run_async(self, coro):
+        """ Run a coroutine to completion on the workshop's event loop """
+        return self._loop.run_until_complete(coro)
+
     def display_transcript(self):
         """ Display the transcript """
         console.clear()
-        console.print("[bold green]Transcript:[/bold green]")
-        for entry in self.transcript_entries[-20:]:
-            rprint(f"[blue]{entry.round}.{entry.turn}[/blue][bold blue]{entry.participant_name}[/bold blue] {entry.content}")
-
-        with open("latest_transcript.txt", "w", encoding="utf-8") as f:
-            f.write("\n".join(self.get_transcript()))
+        console.print(TRANSCRIPT_HEADER)
+        for entry in self._transcript_tail:
+            console.print(Text.assemble(
+                (f"{entry.round}.{entry.turn}", TURN_STYLE),
+                (entry.participant_name, SPEAKER_STYLE),
+                " ",
+                entry.content,
+            ))
+
+        self.sync_transcript_file()
+
+    def sync_transcript_file(self):
+        """ Bring latest_transcript.txt up to date with the full transcript """
+        if self._transcript_file is None:
+            # First write of the session, or after a restore: start afresh
+            self._transcript_file = open("latest_transcript.txt", "w", encoding="utf-8")
+            self._transcript_written_count = 0
+        # Append only the new lines
+        new_lines = self._transcript_lines[self._transcript_written_count:]
+        if new_lines:
+            self._transcript_file.writelines(line + "\n" for line in new_lines)
+            self._transcript_file.flush()
+            self._transcript_written_count = len(self._transcript_lines)
+
+    def close_transcript_file(self):
+        """ Close latest_transcript.txt, if it is open """
+        if self._transcript_file is not None:
+            self._transcript_file.close()
+            self._transcript_file = None
+
+    def post_feedback(self, message: str):
+        """ Queue a control message from a background thread """
+        self._thread_feedback.put(message)
 
     def display_control_feedback(self):
         """ Display the control feedback """
-        console.print("\n[bold red]Control Messages:[/bold red]")
-        for line in self.control_feedback[-5:]:
-            console.print(line)
-
-    def handle_util_command(self, args):
-        """ Handle commands """
-        if not args:
-            self.control_feedback.append("Usage: /util [action] [parameters]")
-            return
-
-        action = args[0]
-        params = args[1:]
-        if action == "summerize":
-            prompt = f"""
+        while not self._thread_feedback.empty():
+            self.control_feedback.append(self._thread_feedback.get())
+        console.print(FEEDBACK_HEADER)
+        # Feedback quotes config values, file names and errors, so brackets
+        # in it are literal text, not rich markup
+        for line in self.control_feedback:
+            console.print(line, markup=False)
+
+    async def summarize(self, content: str) -> str:
+        """ Compress transcript text with the LLM """
+        prompt = f"""
               [TASK]
                 Compress the following content, the goal is to reduce tokens, without losing information.
               [/TASK]
               [GUIDANCE]
                 Prioritise key predicates, ideas, insights, and conclusions.
+                Attribute ideas to the participants who raised them.
                 Discard irrelevant information.
               [/GUIDANCE]
               [CONTENT]
-                {self.get_transcript()}
+                {content}
               [/CONTENT]
               """
-            response = self.llm.get_response(
-                prompt=prompt,
-                system_message=f"You are a summarizer, you compress text.",
-            )
-            summary = response["message"]["content"]
+        summary, _ = await self.llm.aget_response(
+            prompt=prompt,
+            system_message="You are a summarizer, you compress text.",
+            get_tokens=True,
+        )
+        return summary
+
+    def handle_util_command(self, args):
+        """ Handle commands """
+        if not args:
+            self.control_feedback.append("Usage: /util [action] [parameters]")
+            return
+
+        action = args[0]
+        params = args[1:]
+        if action == "summerize":
+            lines = self._transcript_lines
+            chunks = [
+                "\n".join(lines[i:i + SUMMARY_CHUNK_LINES])
+                for i in range(0, len(lines), SUMMARY_CHUNK_LINES)
+            ]
+
+            async def summarize_chunks():
+                return await asyncio.gather(*[self.summarize(chunk) for chunk in chunks])
+
+            summary = "\n".join(self.run_async(summarize_chunks()))
             with open("summary.txt", "w") as f:
                 f.write(summary)
         else:
             self.control_feedback.append(f"Unknown util action: {action}")
 
 
+class AutoSaver:
+    """
+    Saves workshop snapshots on a background thread, so checkpointing
+    never blocks the prompt. Snapshots are taken on the caller's thread;
+    only serialisation and the file write happen in the background.
+    """
+    def __init__(self, workshop: Workshop, filename: str):
+        self.workshop = workshop
+        self.filename = filename
+        self._snapshots: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self):
+        """ Queue a save if anything changed since the last one """
+        if self.workshop.dirty:
+            self._snapshots.put(self.workshop.get_state_snapshot())
+            self.workshop.dirty = False
+
+    def close(self):
+        """ Write any pending snapshot and stop the worker """
+        self._snapshots.put(None)
+        self._thread.join()
+
+    def _run(self):
+        running = True
+        while running:
+            snapshot = self._snapshots.get()
+            # Only the newest queued snapshot matters; None means stop
+            while not self._snapshots.empty():
+                newer = self._snapshots.get()
+                if newer is None:
+                    running = False
+                else:
+                    snapshot = newer
+            if snapshot is None:
+                return
+            try:
+                write_state_file(snapshot, self.filename)
+            except Exception as e:
+                self.workshop.post_feedback(
+                    f"Error autosaving workshop state to '{self.filename}': {e}"
+                )
+
+
 def main(arg):
     """ main function to run the workshop """
+    # Imported here so the module can be used without pulling in the ollama client
+    from ollama import AsyncClient, Client
+
     model="mistral:latest"
+    host="http://localhost:11434"
 
     llm = LLMInterface(
-        client=Client(host="http://localhost:11434"), model=model
+        client=Client(host=host), model=model, async_client=AsyncClient(host=host)
     )
     workshop = Workshop(llm_client=llm, context_length=32000)
 
+    def warm_up():
+        try:
+            llm.warm_up()
+        except Exception as e:
+            workshop.post_feedback(f"Could not preload {model}: {e}")
+
+    # Load the model while the user is still typing their first commands
+    threading.Thread(target=warm_up, daemon=True).start()
+
 
     if arg and arg.endswith(".json"):
         workshop.load_state(arg)
@@ -558,6 +1089,8 @@ def main(arg):
         print(f"Loading configuration file {arg}")
         workshop.handle_load_command([arg])
 
+    autosaver = AutoSaver(workshop, "final_state.json")
+
     ## Main Turn Loop
     while workshop.get_state() != WorkshopState.ENDING:
         try:
@@ -565,14 +1098,13 @@ def main(arg):
             workshop.display_control_feedback()
             command = Prompt.ask("\n>>>")
             workshop.handle_command(command)
-            workshop.save_state("final_state.json")  # Save final state when exiting
+            autosaver.request()  # Checkpoint in the background while we wait for input
         except KeyboardInterrupt:
             workshop.handle_command("/exit")
 
-    workshop.save_state("final_state.json")
-    print("Workshop ended. Final state saved.")
-
-    workshop.save_state("final_state.json")  # Save final state when exiting
+    autosaver.close()
+    workshop.close_transcript_file()
+    workshop.save_state("final_state.json", durable=True)  # Save final state when exiting
     print("Workshop ended. Final state saved.")
 
 